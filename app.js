@@ -97,12 +97,18 @@ class VoiceAssistantUI {
     }
     
     startEventPolling() {
-        // Poll for events every 2 seconds
-        setInterval(() => {
-            if (this.isAssistantActive) {
-                this.loadEvents();
-            }
-        }, 2000);
+        if (window.EventSource) {
+            // The server pushes each new event; EventSource reconnects on its own
+            this.eventSource = new EventSource('/api/voice/events/stream');
+            this.eventSource.onmessage = (e) => this.addStreamedEvent(JSON.parse(e.data));
+        } else {
+            // Poll for events every 2 seconds
+            setInterval(() => {
+                if (this.isAssistantActive) {
+                    this.loadEvents();
+                }
+            }, 2000);
+        }
         
         // Poll for status every 5 seconds
         setInterval(() => {
@@ -474,19 +480,37 @@ class VoiceAssistantUI {
     
     async loadEvents() {
         try {
-            const response = await fetch('/api/voice/events?limit=50');
-            const data = await response.json();
-            
-            if (data.success) {
-                this.events = data.events;
-                this.renderEvents();
-                this.updateTranscription();
+            const response = await fetch('/api/voice/events.ndjson?limit=50');
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
             }
+            
+            // One JSON event per line
+            const text = await response.text();
+            this.events = text.split('\n')
+                .filter(line => line)
+                .map(line => JSON.parse(line));
+            this.renderEvents();
+            this.updateTranscription();
         } catch (error) {
             console.error('Error loading events:', error);
         }
     }
     
+    addStreamedEvent(event) {
+        // Skip events the initial load already fetched
+        if (this.events.some(existing => existing.id === event.id)) {
+            return;
+        }
+        
+        this.events.push(event);
+        if (this.events.length > 50) {
+            this.events = this.events.slice(-50);
+        }
+        this.renderEvents();
+        this.updateTranscription();
+    }
+    
     renderEvents() {
         const filteredEvents = this.getFilteredEvents();
         
@@ -504,7 +528,7 @@ class VoiceAssistantUI {
             <div class="activity-item">
                 <div class="activity-header">
                     <span class="activity-type ${event.type}">${event.type}</span>
-                    <span class="activity-timestamp">${new Date(event.timestamp * 1000).toLocaleString()}</span>
+                    <span class="activity-timestamp">${new Date(event.timestamp).toLocaleString()}</span>
                 </div>
                 <div class="activity-message">${event.message}</div>
                 ${event.data && Object.keys(event.data).length > 0 ? `
@@ -550,7 +574,7 @@ class VoiceAssistantUI {
         
         this.transcriptionDisplay.innerHTML = transcriptionEvents.slice(-10).map(event => `
             <div class="transcription-item ${event.type === 'transcription_partial' ? 'partial' : ''}">
-                <div class="timestamp">${new Date(event.timestamp * 1000).toLocaleString()}</div>
+                <div class="timestamp">${new Date(event.timestamp).toLocaleString()}</div>
                 <div class="text">${event.message}</div>
             </div>
         `).join('');
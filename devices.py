@@ -2,29 +2,112 @@
 Flask routes for IoT device management
 """
 
-from flask import Blueprint, jsonify, request
-from src.iot_devices import device_manager, DeviceType, SmartLight, SmartThermostat, SmartFan, SmartDoorLock
+from flask import Blueprint, Response, request
+from pydantic import BaseModel, ValidationError
+from src.iot_devices import device_manager, DeviceType, DEVICE_FACTORIES, DEVICE_TYPE_BY_VALUE, DEVICE_TYPE_VALUES
+import hashlib
 import logging
+import orjson
+import os
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 devices_bp = Blueprint('devices', __name__)
 
+# Device lists at least this long are streamed rather than serialized in one go
+STREAM_MIN_DEVICES = 500
+
+# Mixed into every ETag: manager versions restart from zero with the process
+_BOOT_ID = os.urandom(4).hex()
+
+class AddDeviceRequest(BaseModel):
+    """Body of POST /add"""
+    id: str
+    name: str
+    device_type: DeviceType
+    location: str
+
+def describe_validation_error(error: ValidationError) -> str:
+    """Summarize the first validation error in the API's message style"""
+    first = error.errors()[0]
+    field = first['loc'][0] if first['loc'] else None
+    if first['type'] == 'missing':
+        return f'Field "{field}" is required'
+    if field == 'device_type':
+        return f'Invalid device type: {first["input"]}'
+    if field is None:
+        return f'Invalid device data: {first["msg"]}'
+    return f'Invalid field "{field}": {first["msg"]}'
+
+def jsonify_fast(obj, status: int = 200) -> Response:
+    """Serialize obj with orjson into a JSON response"""
+    return Response(orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+                    status=status, mimetype='application/json')
+
+def make_etag(etag_src) -> str:
+    """Compute a short ETag from any value with a stable repr"""
+    return hashlib.blake2b(repr((_BOOT_ID, etag_src)).encode(), digest_size=12).hexdigest()
+
+def conditional(etag_src, build_payload) -> Response:
+    """
+    Answer a GET with 304 Not Modified if the client already holds the
+    current representation, otherwise build and tag the JSON response.
+    
+    Args:
+        etag_src: Cheap value identifying the current state of the resource
+        build_payload: Callable returning the response body (or a ready
+            Response), only invoked on a miss
+    """
+    return conditional_etag(make_etag(etag_src), build_payload)
+
+def etag_matches(etag: str) -> bool:
+    """Check If-None-Match against an ETag we issued"""
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return True
+    # Compressed responses carry our tag with a ":<algorithm>" suffix
+    return any(tag.split(':', 1)[0] == etag
+               for tag in if_none_match.as_set(include_weak=True))
+
+def conditional_etag(etag: str, build_payload) -> Response:
+    """Like conditional(), with a ready-made ETag"""
+    if etag_matches(etag):
+        response = Response(status=304)
+    else:
+        payload = build_payload()
+        response = payload if isinstance(payload, Response) else jsonify_fast(payload)
+    response.set_etag(etag)
+    return response
+
+def _stream_devices(items):
+    """Yield the get_all_devices payload in chunks, one device at a time"""
+    yield b'{"success":true,"devices":{'
+    for i, (device_id, data) in enumerate(items):
+        if i:
+            yield b','
+        yield orjson.dumps(device_id) + b':' + orjson.dumps(data)
+    yield b'},"count":%d}' % len(items)
+
 @devices_bp.route('/', methods=['GET'])
 def get_all_devices():
     """Get all IoT devices"""
     try:
-        devices = device_manager.get_devices_dict()
-        return jsonify({
-            'success': True,
-            'devices': devices,
-            'count': len(devices)
-        })
+        def build_payload():
+            devices = device_manager.get_devices_dict()
+            if len(devices) >= STREAM_MIN_DEVICES:
+                # Snapshot the shared mapping; the generator runs after we return
+                return Response(_stream_devices(list(devices.items())),
+                                mimetype='application/json')
+            return {
+                'success': True,
+                'devices': devices,
+                'count': len(devices)
+            }
+        
+        return conditional(('devices', device_manager.version), build_payload)
     except Exception as e:
         logger.error(f"Error getting devices: {e}")
-        return jsonify({
+        return jsonify_fast({
             'success': False,
             'message': f'Failed to get devices: {str(e)}'
         }), 500
@@ -35,18 +118,20 @@ def get_device(device_id):
     try:
         device = device_manager.get_device(device_id)
         if device:
-            return jsonify({
+            # The revision is read before the body is built, so the tag
+            # never claims a newer state than the body it goes with
+            return conditional((device.id, device.revision), lambda: {
                 'success': True,
                 'device': device.to_dict()
             })
         else:
-            return jsonify({
+            return jsonify_fast({
                 'success': False,
                 'message': f'Device {device_id} not found'
             }), 404
     except Exception as e:
         logger.error(f"Error getting device {device_id}: {e}")
-        return jsonify({
+        return jsonify_fast({
             'success': False,
             'message': f'Failed to get device: {str(e)}'
         }), 500
@@ -57,13 +142,13 @@ def search_devices():
     try:
         query = request.args.get('q', '')
         if not query:
-            return jsonify({
+            return jsonify_fast({
                 'success': False,
                 'message': 'Query parameter "q" is required'
             }), 400
         
         devices = device_manager.search_devices(query)
-        return jsonify({
+        return jsonify_fast({
             'success': True,
             'devices': [device.to_dict() for device in devices],
             'count': len(devices),
@@ -71,7 +156,7 @@ def search_devices():
         })
     except Exception as e:
         logger.error(f"Error searching devices: {e}")
-        return jsonify({
+        return jsonify_fast({
             'success': False,
             'message': f'Failed to search devices: {str(e)}'
         }), 500
@@ -81,24 +166,29 @@ def get_devices_by_type(device_type):
     """Get devices by type"""
     try:
         # Validate device type
-        try:
-            dtype = DeviceType(device_type)
-        except ValueError:
-            return jsonify({
+        dtype = DEVICE_TYPE_BY_VALUE.get(device_type)
+        if dtype is None:
+            return jsonify_fast({
                 'success': False,
                 'message': f'Invalid device type: {device_type}'
             }), 400
         
-        devices = device_manager.find_devices_by_type(dtype)
-        return jsonify({
-            'success': True,
-            'devices': [device.to_dict() for device in devices],
-            'count': len(devices),
-            'device_type': device_type
-        })
+        # Versioned per type, so changes to other device types keep this cached
+        version = device_manager.type_version(dtype)
+        
+        def build_payload():
+            devices = device_manager.find_devices_by_type(dtype)
+            return {
+                'success': True,
+                'devices': [device.to_dict() for device in devices],
+                'count': len(devices),
+                'device_type': device_type
+            }
+        
+        return conditional_etag(f'{dtype.value}-{_BOOT_ID}-{version}', build_payload)
     except Exception as e:
         logger.error(f"Error getting devices by type: {e}")
-        return jsonify({
+        return jsonify_fast({
             'success': False,
             'message': f'Failed to get devices by type: {str(e)}'
         }), 500
@@ -107,16 +197,19 @@ def get_devices_by_type(device_type):
 def get_devices_by_location(location):
     """Get devices by location"""
     try:
-        devices = device_manager.find_devices_by_location(location)
-        return jsonify({
-            'success': True,
-            'devices': [device.to_dict() for device in devices],
-            'count': len(devices),
-            'location': location
-        })
+        def build_payload():
+            devices = device_manager.find_devices_by_location(location)
+            return {
+                'success': True,
+                'devices': [device.to_dict() for device in devices],
+                'count': len(devices),
+                'location': location
+            }
+        
+        return conditional(('by-location', location, device_manager.version), build_payload)
     except Exception as e:
         logger.error(f"Error getting devices by location: {e}")
-        return jsonify({
+        return jsonify_fast({
             'success': False,
             'message': f'Failed to get devices by location: {str(e)}'
         }), 500
@@ -127,7 +220,7 @@ def control_device(device_id):
     try:
         data = request.get_json()
         if not data or 'action' not in data:
-            return jsonify({
+            return jsonify_fast({
                 'success': False,
                 'message': 'Action is required'
             }), 400
@@ -138,13 +231,13 @@ def control_device(device_id):
         result = device_manager.control_device(device_id, action, **kwargs)
         
         if result['success']:
-            return jsonify(result)
+            return jsonify_fast(result)
         else:
-            return jsonify(result), 400
+            return jsonify_fast(result), 400
     
     except Exception as e:
         logger.error(f"Error controlling device {device_id}: {e}")
-        return jsonify({
+        return jsonify_fast({
             'success': False,
             'message': f'Failed to control device: {str(e)}'
         }), 500
@@ -155,64 +248,51 @@ def add_device():
     try:
         data = request.get_json()
         if not data:
-            return jsonify({
+            return jsonify_fast({
                 'success': False,
                 'message': 'Device data is required'
             }), 400
         
-        # Validate required fields
-        required_fields = ['id', 'name', 'device_type', 'location']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'success': False,
-                    'message': f'Field "{field}" is required'
-                }), 400
-        
-        # Validate device type
+        # Validate required fields and the device type in one pass
         try:
-            device_type = DeviceType(data['device_type'])
-        except ValueError:
-            return jsonify({
+            device_request = AddDeviceRequest.model_validate(data)
+        except ValidationError as e:
+            return jsonify_fast({
                 'success': False,
-                'message': f'Invalid device type: {data["device_type"]}'
+                'message': describe_validation_error(e),
+                'errors': e.errors(include_url=False, include_context=False, include_input=False)
             }), 400
         
         # Create device based on type
-        device_id = data['id']
-        name = data['name']
-        location = data['location']
+        device_type = device_request.device_type
+        device_id = device_request.id
+        name = device_request.name
+        location = device_request.location
         
-        if device_type == DeviceType.LIGHT:
-            device = SmartLight(device_id, name, location)
-        elif device_type == DeviceType.THERMOSTAT:
-            device = SmartThermostat(device_id, name, location)
-        elif device_type == DeviceType.FAN:
-            device = SmartFan(device_id, name, location)
-        elif device_type == DeviceType.DOOR_LOCK:
-            device = SmartDoorLock(device_id, name, location)
-        else:
-            return jsonify({
+        device_class = DEVICE_FACTORIES.get(device_type)
+        if device_class is None:
+            return jsonify_fast({
                 'success': False,
                 'message': f'Device type {device_type.value} not yet supported for creation'
             }), 400
+        device = device_class(device_id, name, location)
         
         # Add device to manager
         if device_manager.add_device(device):
-            return jsonify({
+            return jsonify_fast({
                 'success': True,
                 'message': f'Device {name} added successfully',
                 'device': device.to_dict()
             })
         else:
-            return jsonify({
+            return jsonify_fast({
                 'success': False,
                 'message': f'Device with ID {device_id} already exists'
             }), 400
     
     except Exception as e:
         logger.error(f"Error adding device: {e}")
-        return jsonify({
+        return jsonify_fast({
             'success': False,
             'message': f'Failed to add device: {str(e)}'
         }), 500
@@ -222,68 +302,56 @@ def remove_device(device_id):
     """Remove a device"""
     try:
         if device_manager.remove_device(device_id):
-            return jsonify({
+            return jsonify_fast({
                 'success': True,
                 'message': f'Device {device_id} removed successfully'
             })
         else:
-            return jsonify({
+            return jsonify_fast({
                 'success': False,
                 'message': f'Device {device_id} not found'
             }), 404
     
     except Exception as e:
         logger.error(f"Error removing device {device_id}: {e}")
-        return jsonify({
+        return jsonify_fast({
             'success': False,
             'message': f'Failed to remove device: {str(e)}'
         }), 500
 
+# DeviceType is fixed at import, so the /types response is built once
+_TYPES_BODY = orjson.dumps({
+    'success': True,
+    'device_types': DEVICE_TYPE_VALUES
+})
+_TYPES_ETAG = hashlib.blake2b(_TYPES_BODY, digest_size=8).hexdigest()
+
 @devices_bp.route('/types', methods=['GET'])
 def get_device_types():
     """Get available device types"""
-    return jsonify({
-        'success': True,
-        'device_types': [dtype.value for dtype in DeviceType]
-    })
+    if etag_matches(_TYPES_ETAG):
+        response = Response(status=304)
+    else:
+        response = Response(_TYPES_BODY, mimetype='application/json')
+    response.set_etag(_TYPES_ETAG)
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
 
 @devices_bp.route('/stats', methods=['GET'])
 def get_device_stats():
     """Get device statistics"""
     try:
-        all_devices = device_manager.get_all_devices()
-        
-        # Count by type
-        type_counts = {}
-        for device in all_devices:
-            device_type = device.device_type.value
-            type_counts[device_type] = type_counts.get(device_type, 0) + 1
-        
-        # Count by status
-        status_counts = {}
-        for device in all_devices:
-            status = device.status.value
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
-        # Count by location
-        location_counts = {}
-        for device in all_devices:
-            location = device.location
-            location_counts[location] = location_counts.get(location, 0) + 1
-        
-        return jsonify({
-            'success': True,
-            'stats': {
-                'total_devices': len(all_devices),
-                'by_type': type_counts,
-                'by_status': status_counts,
-                'by_location': location_counts
+        def build_payload():
+            return {
+                'success': True,
+                'stats': device_manager.get_device_stats()
             }
-        })
+        
+        return conditional(('stats', device_manager.version), build_payload)
     
     except Exception as e:
         logger.error(f"Error getting device stats: {e}")
-        return jsonify({
+        return jsonify_fast({
             'success': False,
             'message': f'Failed to get device stats: {str(e)}'
         }), 500
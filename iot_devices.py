@@ -3,18 +3,22 @@ IoT Device Simulation Module
 Simulates various IoT devices that can be controlled by voice commands
 """
 
+import itertools
 import json
 import time
 import threading
 import logging
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Optional, Tuple
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass, field
 from enum import Enum
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Serializes IoTDevice revision bumps; held for a single increment
+_revision_lock = threading.Lock()
+
 class DeviceType(Enum):
     """Types of IoT devices"""
     LIGHT = "light"
@@ -26,6 +30,10 @@ class DeviceType(Enum):
     SPEAKER = "speaker"
     TV = "tv"
 
+def _trigrams(text: str) -> set:
+    """Return the set of 3-character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
 class DeviceStatus(Enum):
     """Device status states"""
     ON = "on"
@@ -33,7 +41,11 @@ class DeviceStatus(Enum):
     UNKNOWN = "unknown"
     ERROR = "error"
 
-@dataclass
+# Value -> member lookups, so request validation avoids Enum.__call__
+DEVICE_TYPE_BY_VALUE: Dict[str, DeviceType] = {dtype.value: dtype for dtype in DeviceType}
+DEVICE_TYPE_VALUES = tuple(DEVICE_TYPE_BY_VALUE)
+
+@dataclass(slots=True)
 class IoTDevice:
     """Base IoT device class"""
     id: str
@@ -44,42 +56,123 @@ class IoTDevice:
     properties: Dict[str, Any] = None
     last_updated: float = None
     
+    # Internal state; declared as fields so it gets a slot
+    # Lowercased copies of name/location used by the manager's lookups
+    name_lower: str = field(init=False, repr=False, compare=False)
+    location_lower: str = field(init=False, repr=False, compare=False)
+    # Bumped by every mutation; the dict cache is tagged with the revision
+    # it was built at so a snapshot raced by a mutation is never served
+    _revision: int = field(default=0, init=False, repr=False, compare=False)
+    _dict_cache: Optional[Tuple[int, Dict[str, Any]]] = field(
+        default=None, init=False, repr=False, compare=False)
+    # Set by the owning manager to keep its caches and aggregates current
+    _on_change: Optional[Callable[['IoTDevice'], None]] = field(
+        default=None, init=False, repr=False, compare=False)
+    _on_status_change: Optional[Callable[['IoTDevice', DeviceStatus], None]] = field(
+        default=None, init=False, repr=False, compare=False)
+    
+    # Actions accepted by IoTDeviceManager.control_device:
+    # action -> (method name, {keyword argument: default value})
+    ACTIONS = {
+        'turn_on': ('turn_on', {}),
+        'turn_off': ('turn_off', {}),
+    }
+    
     def __post_init__(self):
         if self.properties is None:
             self.properties = {}
         if self.last_updated is None:
             self.last_updated = time.time()
+        self.name_lower = self.name.lower()
+        self.location_lower = self.location.lower()
+    
+    @property
+    def revision(self) -> int:
+        """Counter bumped after every state change"""
+        return self._revision
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert device to dictionary"""
-        data = asdict(self)
-        data['device_type'] = self.device_type.value
-        data['status'] = self.status.value
+        """Convert device to dictionary (cached until the next mutation, treat as read-only)"""
+        # Read the revision before the state: if a mutation lands while we
+        # build, its bump makes the stored entry stale rather than served
+        revision = self._revision
+        cached = self._dict_cache
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        
+        # Built by hand rather than with asdict(), which would also
+        # deep-copy the internal fields
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'device_type': self.device_type.value,
+            'location': self.location,
+            'status': self.status.value,
+            'properties': dict(self.properties),
+            'last_updated': self.last_updated
+        }
+        self._dict_cache = (revision, data)
         return data
     
+    def _invalidate(self):
+        """Drop the cached dictionary after a state change"""
+        # Locked so concurrent mutators can't lose a bump
+        with _revision_lock:
+            self._revision += 1
+        self._dict_cache = None
+        if self._on_change:
+            self._on_change(self)
+    
+    def _set_status(self, status: DeviceStatus):
+        """Change the device status, notifying the owning manager"""
+        on_status_change = self._on_status_change
+        if on_status_change is None:
+            self.status = status
+        else:
+            # The manager assigns the status under its lock, keeping its
+            # counts in step with the device
+            on_status_change(self, status)
+    
     def update_property(self, key: str, value: Any):
         """Update a device property"""
         self.properties[key] = value
         self.last_updated = time.time()
-        logger.info(f"Device {self.name} property {key} updated to {value}")
+        self._invalidate()
+        logger.debug("Device %s property %s updated to %s", self.name, key, value)
+    
+    def update_properties(self, updates: Dict[str, Any]):
+        """Update several device properties as a single change"""
+        self.properties.update(updates)
+        self.last_updated = time.time()
+        self._invalidate()
+        logger.debug("Device %s properties updated: %s", self.name, updates)
     
     def turn_on(self) -> bool:
         """Turn the device on"""
-        self.status = DeviceStatus.ON
+        self._set_status(DeviceStatus.ON)
         self.last_updated = time.time()
-        logger.info(f"Device {self.name} turned on")
+        self._invalidate()
+        logger.debug("Device %s turned on", self.name)
         return True
     
     def turn_off(self) -> bool:
         """Turn the device off"""
-        self.status = DeviceStatus.OFF
+        self._set_status(DeviceStatus.OFF)
         self.last_updated = time.time()
-        logger.info(f"Device {self.name} turned off")
+        self._invalidate()
+        logger.debug("Device %s turned off", self.name)
         return True
 
 class SmartLight(IoTDevice):
     """Smart light device"""
     
+    __slots__ = ()
+    
+    ACTIONS = {
+        **IoTDevice.ACTIONS,
+        'set_brightness': ('set_brightness', {'brightness': 100}),
+    }
+    
     def __init__(self, id: str, name: str, location: str):
         super().__init__(id, name, DeviceType.LIGHT, location)
         self.properties = {
@@ -91,11 +184,12 @@ class SmartLight(IoTDevice):
     def set_brightness(self, brightness: int) -> bool:
         """Set light brightness (0-100)"""
         if 0 <= brightness <= 100:
-            self.update_property('brightness', brightness)
+            # Status first, so the single invalidation covers both changes
             if brightness == 0:
-                self.status = DeviceStatus.OFF
+                self._set_status(DeviceStatus.OFF)
             else:
-                self.status = DeviceStatus.ON
+                self._set_status(DeviceStatus.ON)
+            self.update_property('brightness', brightness)
             return True
         return False
     
@@ -109,6 +203,13 @@ class SmartLight(IoTDevice):
 class SmartThermostat(IoTDevice):
     """Smart thermostat device"""
     
+    __slots__ = ()
+    
+    ACTIONS = {
+        **IoTDevice.ACTIONS,
+        'set_temperature': ('set_temperature', {'temperature': 22}),
+    }
+    
     def __init__(self, id: str, name: str, location: str):
         super().__init__(id, name, DeviceType.THERMOSTAT, location)
         self.properties = {
@@ -121,8 +222,8 @@ class SmartThermostat(IoTDevice):
     def set_temperature(self, temperature: int) -> bool:
         """Set target temperature"""
         if 10 <= temperature <= 35:
+            self._set_status(DeviceStatus.ON)
             self.update_property('target_temperature', temperature)
-            self.status = DeviceStatus.ON
             return True
         return False
     
@@ -130,14 +231,21 @@ class SmartThermostat(IoTDevice):
         """Set thermostat mode"""
         valid_modes = ['auto', 'heat', 'cool', 'off']
         if mode.lower() in valid_modes:
+            self._set_status(DeviceStatus.ON if mode != 'off' else DeviceStatus.OFF)
             self.update_property('mode', mode.lower())
-            self.status = DeviceStatus.ON if mode != 'off' else DeviceStatus.OFF
             return True
         return False
 
 class SmartFan(IoTDevice):
     """Smart fan device"""
     
+    __slots__ = ()
+    
+    ACTIONS = {
+        **IoTDevice.ACTIONS,
+        'set_speed': ('set_speed', {'speed': 1}),
+    }
+    
     def __init__(self, id: str, name: str, location: str):
         super().__init__(id, name, DeviceType.FAN, location)
         self.properties = {
@@ -149,11 +257,11 @@ class SmartFan(IoTDevice):
     def set_speed(self, speed: int) -> bool:
         """Set fan speed (0-5)"""
         if 0 <= speed <= 5:
-            self.update_property('speed', speed)
             if speed == 0:
-                self.status = DeviceStatus.OFF
+                self._set_status(DeviceStatus.OFF)
             else:
-                self.status = DeviceStatus.ON
+                self._set_status(DeviceStatus.ON)
+            self.update_property('speed', speed)
             return True
         return False
     
@@ -165,6 +273,14 @@ class SmartFan(IoTDevice):
 class SmartDoorLock(IoTDevice):
     """Smart door lock device"""
     
+    __slots__ = ()
+    
+    ACTIONS = {
+        **IoTDevice.ACTIONS,
+        'lock': ('lock', {}),
+        'unlock': ('unlock', {}),
+    }
+    
     def __init__(self, id: str, name: str, location: str):
         super().__init__(id, name, DeviceType.DOOR_LOCK, location)
         self.properties = {
@@ -175,24 +291,100 @@ class SmartDoorLock(IoTDevice):
     
     def lock(self) -> bool:
         """Lock the door"""
-        self.update_property('locked', True)
-        self.update_property('last_access', time.time())
-        self.status = DeviceStatus.ON
+        # Status first, so the single invalidation covers both changes
+        self._set_status(DeviceStatus.ON)
+        self.update_properties({'locked': True, 'last_access': time.time()})
         return True
     
     def unlock(self) -> bool:
         """Unlock the door"""
-        self.update_property('locked', False)
-        self.update_property('last_access', time.time())
-        self.status = DeviceStatus.ON
+        # Status first, so the single invalidation covers both changes
+        self._set_status(DeviceStatus.ON)
+        self.update_properties({'locked': False, 'last_access': time.time()})
         return True
 
+class RWLock:
+    """Reader/writer lock: any number of readers, or a single writer.
+    
+    Waiting writers block new readers so a steady read load cannot starve
+    them. Not reentrant.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+    
+    @contextmanager
+    def read_lock(self):
+        """Hold the lock shared for the duration of the block"""
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def write_lock(self):
+        """Hold the lock exclusively for the duration of the block"""
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
 class IoTDeviceManager:
     """Manages all IoT devices"""
     
+    # Number of distinct search queries whose results are memoized
+    SEARCH_CACHE_SIZE = 256
+    
     def __init__(self):
         self.devices: Dict[str, IoTDevice] = {}
-        self.device_lock = threading.Lock()
+        self.device_lock = RWLock()
+        self._version = 0
+        
+        # Secondary indexes, kept in sync with self.devices by
+        # _index_device/_unindex_device
+        self._by_name: Dict[str, IoTDevice] = {}
+        self._by_location: Dict[str, List[IoTDevice]] = defaultdict(list)
+        self._by_type: Dict[DeviceType, List[IoTDevice]] = defaultdict(list)
+        # Trigram -> device ids, over lowercased names and locations
+        self._trigrams: Dict[str, set] = defaultdict(set)
+        # Insertion sequence per device id, so indexed results keep dict order
+        self._order: Dict[str, int] = {}
+        self._sequence = itertools.count()
+        # Lowercased query -> matching device ids, LRU ordered. Names and
+        # locations never change, so only add/remove invalidate it.
+        self._search_cache: OrderedDict = OrderedDict()
+        self._search_cache_lock = threading.Lock()
+        
+        # Per-type change counters, so one type's listing can be revalidated alone
+        self._type_version: Dict[DeviceType, int] = defaultdict(int)
+        
+        # Aggregates served by get_device_stats(), keyed by display value
+        self._type_counts: Counter = Counter()
+        self._status_counts: Counter = Counter()
+        self._location_counts: Counter = Counter()
+        
+        # get_devices_dict() result; entries in _dirty_ids are rebuilt lazily
+        self._devices_dict_cache: Dict[str, Dict[str, Any]] = {}
+        self._dirty_ids: set = set()
+        
         self._initialize_default_devices()
     
     def _initialize_default_devices(self):
@@ -208,74 +400,247 @@ class IoTDeviceManager:
             SmartDoorLock("lock_2", "Back Door", "back_yard"),
         ]
         
-        for device in default_devices:
-            self.devices[device.id] = device
+        with self.device_lock.write_lock():
+            for device in default_devices:
+                self._index_device(device)
         
         logger.info(f"Initialized {len(default_devices)} default IoT devices")
     
+    def _index_device(self, device: IoTDevice):
+        """Store a device and register it in every lookup index (caller holds the write lock)"""
+        self.devices[device.id] = device
+        self._by_name.setdefault(device.name_lower, device)
+        self._by_location[device.location_lower].append(device)
+        self._by_type[device.device_type].append(device)
+        self._order[device.id] = next(self._sequence)
+        for trigram in self._device_trigrams(device):
+            self._trigrams[trigram].add(device.id)
+        self._clear_search_cache()
+        
+        self._type_counts[device.device_type.value] += 1
+        self._status_counts[device.status.value] += 1
+        self._location_counts[device.location] += 1
+        self._devices_dict_cache[device.id] = device.to_dict()
+        self._type_version[device.device_type] += 1
+        device._on_change = self._device_changed
+        device._on_status_change = self._status_changed
+    
+    def _unindex_device(self, device: IoTDevice):
+        """Drop a device from storage and every lookup index (caller holds the write lock)"""
+        del self.devices[device.id]
+        
+        name_lower = device.name_lower
+        if self._by_name.get(name_lower) is device:
+            del self._by_name[name_lower]
+            # Another device may share the name; keep the first one reachable
+            for other in self.devices.values():
+                if other.name_lower == name_lower:
+                    self._by_name[name_lower] = other
+                    break
+        
+        for index, key in ((self._by_location, device.location_lower),
+                           (self._by_type, device.device_type)):
+            bucket = index[key]
+            bucket.remove(device)
+            if not bucket:
+                del index[key]
+        
+        del self._order[device.id]
+        for trigram in self._device_trigrams(device):
+            posting = self._trigrams[trigram]
+            posting.discard(device.id)
+            if not posting:
+                del self._trigrams[trigram]
+        self._clear_search_cache()
+        
+        device._on_change = None
+        device._on_status_change = None
+        del self._devices_dict_cache[device.id]
+        self._dirty_ids.discard(device.id)
+        self._type_version[device.device_type] += 1
+        for counts, key in ((self._type_counts, device.device_type.value),
+                            (self._status_counts, device.status.value),
+                            (self._location_counts, device.location)):
+            self._decrement(counts, key)
+    
+    @staticmethod
+    def _decrement(counts: Counter, key: str):
+        """Decrement a counter entry, dropping it when it reaches zero"""
+        counts[key] -= 1
+        if counts[key] <= 0:
+            del counts[key]
+    
+    def _device_changed(self, device: IoTDevice):
+        """Change hook installed on every managed device"""
+        self._dirty_ids.add(device.id)
+        self._type_version[device.device_type] += 1
+        self._version += 1
+    
+    def _status_changed(self, device: IoTDevice, new_status: DeviceStatus):
+        """Status change hook installed on every managed device"""
+        with self.device_lock.write_lock():
+            old_status = device.status
+            device.status = new_status
+            # remove_device may have run since the hook was fetched; its
+            # counts already dropped the device
+            if old_status is new_status or self.devices.get(device.id) is not device:
+                return
+            self._decrement(self._status_counts, old_status.value)
+            self._status_counts[new_status.value] += 1
+            self._version += 1
+    
+    def _clear_search_cache(self):
+        """Forget memoized search results (caller holds the write lock)"""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+    
+    @staticmethod
+    def _device_trigrams(device: IoTDevice) -> set:
+        """Trigrams a search query may hit for this device"""
+        return _trigrams(device.name_lower) | _trigrams(device.location_lower)
+    
     def add_device(self, device: IoTDevice) -> bool:
         """Add a new device"""
-        with self.device_lock:
+        with self.device_lock.write_lock():
             if device.id in self.devices:
                 logger.warning(f"Device {device.id} already exists")
                 return False
             
-            self.devices[device.id] = device
+            self._index_device(device)
+            self._version += 1
             logger.info(f"Added device: {device.name} ({device.id})")
             return True
     
     def remove_device(self, device_id: str) -> bool:
         """Remove a device"""
-        with self.device_lock:
+        with self.device_lock.write_lock():
             if device_id in self.devices:
-                device = self.devices.pop(device_id)
+                device = self.devices[device_id]
+                self._unindex_device(device)
+                self._version += 1
                 logger.info(f"Removed device: {device.name} ({device_id})")
                 return True
             return False
     
+    @property
+    def version(self) -> int:
+        """Counter bumped whenever the device set or any device state changes"""
+        return self._version
+    
+    def type_version(self, device_type: DeviceType) -> int:
+        """Counter bumped whenever a device of the given type is added, removed or changed"""
+        return self._type_version.get(device_type, 0)
+    
     def get_device(self, device_id: str) -> Optional[IoTDevice]:
         """Get a device by ID"""
         return self.devices.get(device_id)
     
     def get_device_by_name(self, name: str) -> Optional[IoTDevice]:
         """Get a device by name (case-insensitive)"""
-        name_lower = name.lower()
-        for device in self.devices.values():
-            if device.name.lower() == name_lower:
-                return device
-        return None
+        with self.device_lock.read_lock():
+            return self._by_name.get(name.lower())
+    
+    def resolve_device(self, query: str) -> Optional[IoTDevice]:
+        """
+        Resolve a spoken device reference to a single device
+        
+        Args:
+            query: Device name as heard, possibly partial
+            
+        Returns:
+            The device with exactly that name, otherwise the best partial
+            match from the search index, or None
+        """
+        device = self.get_device_by_name(query)
+        if device:
+            return device
+        
+        matches = self.search_devices(query)
+        if not matches:
+            return None
+        
+        # Prefer name matches over location-only ones, then the name the
+        # query covers most of; max() keeps the earliest device on ties
+        query_lower = query.lower()
+        return max(matches, key=lambda device: (
+            query_lower in device.name_lower,
+            len(query_lower) / max(len(device.name_lower), 1)))
     
     def find_devices_by_location(self, location: str) -> List[IoTDevice]:
         """Find devices by location"""
-        location_lower = location.lower()
-        return [device for device in self.devices.values() 
-                if device.location.lower() == location_lower]
+        with self.device_lock.read_lock():
+            return list(self._by_location.get(location.lower(), ()))
     
     def find_devices_by_type(self, device_type: DeviceType) -> List[IoTDevice]:
         """Find devices by type"""
-        return [device for device in self.devices.values() 
-                if device.device_type == device_type]
+        with self.device_lock.read_lock():
+            return list(self._by_type.get(device_type, ()))
     
     def search_devices(self, query: str) -> List[IoTDevice]:
         """Search devices by name or location"""
         query_lower = query.lower()
-        results = []
         
-        for device in self.devices.values():
-            if (query_lower in device.name.lower() or 
-                query_lower in device.location.lower()):
-                results.append(device)
+        # Cache reads and fills happen under the read lock, so a concurrent
+        # add/remove cannot slip a stale entry in after clearing the cache
+        with self.device_lock.read_lock():
+            with self._search_cache_lock:
+                device_ids = self._search_cache.get(query_lower)
+                if device_ids is not None:
+                    self._search_cache.move_to_end(query_lower)
+            if device_ids is not None:
+                return [self.devices[device_id] for device_id in device_ids]
+            
+            results = self._search_index(query_lower)
+            with self._search_cache_lock:
+                self._search_cache[query_lower] = tuple(device.id for device in results)
+                if len(self._search_cache) > self.SEARCH_CACHE_SIZE:
+                    self._search_cache.popitem(last=False)
+            return results
+    
+    def _search_index(self, query_lower: str) -> List[IoTDevice]:
+        """Uncached search_devices() body (caller holds the read lock)"""
+        if len(query_lower) < 3:
+            # Too short to have a trigram; fall back to a full scan
+            candidates = self.devices.values()
+        else:
+            postings = [self._trigrams.get(trigram) for trigram in _trigrams(query_lower)]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            device_ids = set.intersection(*postings)
+            candidates = sorted((self.devices[device_id] for device_id in device_ids),
+                                key=lambda device: self._order[device.id])
         
-        return results
+        # Sharing every trigram does not imply a substring match, so verify
+        return [device for device in candidates
+                if query_lower in device.name_lower or
+                query_lower in device.location_lower]
     
     def get_all_devices(self) -> List[IoTDevice]:
         """Get all devices"""
-        return list(self.devices.values())
+        with self.device_lock.read_lock():
+            return list(self.devices.values())
+    
+    def get_device_stats(self) -> Dict[str, Any]:
+        """Get device counts by type, status and location"""
+        with self.device_lock.read_lock():
+            return {
+                'total_devices': len(self.devices),
+                'by_type': dict(self._type_counts),
+                'by_status': dict(self._status_counts),
+                'by_location': dict(self._location_counts)
+            }
     
     def get_devices_dict(self) -> Dict[str, Dict[str, Any]]:
-        """Get all devices as dictionary"""
-        return {device_id: device.to_dict() 
-                for device_id, device in self.devices.items()}
+        """Get all devices as dictionary (shared between calls, treat as read-only)"""
+        if self._dirty_ids:
+            with self.device_lock.write_lock():
+                while self._dirty_ids:
+                    device_id = self._dirty_ids.pop()
+                    device = self.devices.get(device_id)
+                    if device:
+                        self._devices_dict_cache[device_id] = device.to_dict()
+        return self._devices_dict_cache
     
     def control_device(self, device_id: str, action: str, **kwargs) -> Dict[str, Any]:
         """Control a device with the specified action"""
@@ -287,29 +652,17 @@ class IoTDeviceManager:
             }
         
         try:
-            if action == 'turn_on':
-                success = device.turn_on()
-            elif action == 'turn_off':
-                success = device.turn_off()
-            elif action == 'set_brightness' and isinstance(device, SmartLight):
-                brightness = kwargs.get('brightness', 100)
-                success = device.set_brightness(brightness)
-            elif action == 'set_temperature' and isinstance(device, SmartThermostat):
-                temperature = kwargs.get('temperature', 22)
-                success = device.set_temperature(temperature)
-            elif action == 'set_speed' and isinstance(device, SmartFan):
-                speed = kwargs.get('speed', 1)
-                success = device.set_speed(speed)
-            elif action == 'lock' and isinstance(device, SmartDoorLock):
-                success = device.lock()
-            elif action == 'unlock' and isinstance(device, SmartDoorLock):
-                success = device.unlock()
-            else:
+            spec = type(device).ACTIONS.get(action)
+            if spec is None:
                 return {
                     'success': False,
                     'message': f'Action {action} not supported for device {device.name}'
                 }
             
+            method_name, defaults = spec
+            success = getattr(device, method_name)(
+                **{key: kwargs.get(key, default) for key, default in defaults.items()})
+            
             if success:
                 return {
                     'success': True,
@@ -341,37 +694,26 @@ class IoTDeviceManager:
             if command_type == 'turn_on':
                 if params:
                     device_name = params[0].strip()
-                    device = self.get_device_by_name(device_name)
+                    device = self.resolve_device(device_name)
                     if device:
                         return self.control_device(device.id, 'turn_on')
                     else:
-                        # Try searching for partial matches
-                        matches = self.search_devices(device_name)
-                        if matches:
-                            device = matches[0]  # Use first match
-                            return self.control_device(device.id, 'turn_on')
-                        else:
-                            return {
-                                'success': False,
-                                'message': f'Device "{device_name}" not found'
-                            }
+                        return {
+                            'success': False,
+                            'message': f'Device "{device_name}" not found'
+                        }
             
             elif command_type == 'turn_off':
                 if params:
                     device_name = params[0].strip()
-                    device = self.get_device_by_name(device_name)
+                    device = self.resolve_device(device_name)
                     if device:
                         return self.control_device(device.id, 'turn_off')
                     else:
-                        matches = self.search_devices(device_name)
-                        if matches:
-                            device = matches[0]
-                            return self.control_device(device.id, 'turn_off')
-                        else:
-                            return {
-                                'success': False,
-                                'message': f'Device "{device_name}" not found'
-                            }
+                        return {
+                            'success': False,
+                            'message': f'Device "{device_name}" not found'
+                        }
             
             elif command_type == 'set_brightness':
                 if len(params) >= 2:
@@ -402,7 +744,7 @@ class IoTDeviceManager:
             elif command_type == 'get_status':
                 if params:
                     device_name = params[0].strip()
-                    device = self.get_device_by_name(device_name)
+                    device = self.resolve_device(device_name)
                     if device:
                         return {
                             'success': True,
@@ -437,6 +779,14 @@ class IoTDeviceManager:
                 'message': f'Error processing command: {str(e)}'
             }
 
+# Device classes that can be created by type, e.g. through the /add endpoint
+DEVICE_FACTORIES: Dict[DeviceType, Callable[[str, str, str], IoTDevice]] = {
+    DeviceType.LIGHT: SmartLight,
+    DeviceType.THERMOSTAT: SmartThermostat,
+    DeviceType.FAN: SmartFan,
+    DeviceType.DOOR_LOCK: SmartDoorLock,
+}
+
 # Global device manager instance
 device_manager = IoTDeviceManager()
 
@@ -1,16 +1,54 @@
+import logging
 import os
 import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
+# Library modules only create loggers; the entrypoint owns the configuration,
+# set before the imports below so their import-time messages are formatted
+logging.basicConfig(level=logging.INFO)
+
+import orjson
 from flask import Flask, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 from src.models.user import db
 from src.routes.user import user_bp
 from src.routes.voice import voice_bp
 from src.routes.devices import devices_bp
 
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used by every jsonify() call"""
+    
+    # Flask 3 dropped the JSON_SORT_KEYS / JSONIFY_PRETTYPRINT_REGULAR config
+    # keys; the provider attributes replace them. Keep key order and never
+    # pretty-print, even in debug mode.
+    sort_keys = False
+    compact = True
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+app.json = OrjsonProvider(app)
+
+# Compress responses, preferring brotli. Streamed responses are left alone:
+# compressing them would buffer the whole stream in memory. Small bodies
+# such as /status fall under the size threshold and are sent as-is.
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_MIN_SIZE'] = 500
+app.config['COMPRESS_STREAMS'] = False
+Compress(app)
 
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(voice_bp, url_prefix='/api/voice')
@@ -2,43 +2,120 @@
 Flask routes for voice assistant API
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from src.voice_assistant import VoiceAssistant
 from src.iot_devices import device_manager
 import logging
+import itertools
+import orjson
+import queue
 import threading
 import time
+from collections import OrderedDict, deque
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 voice_bp = Blueprint('voice', __name__)
 
-# Global voice assistant instance
+# Global voice assistant instance. assistant_lock serializes /start and
+# /stop; readers take a local reference to voice_assistant instead.
 voice_assistant = None
 assistant_lock = threading.Lock()
 
-# Store recent events for the web interface
-recent_events = []
+# /test remembers recent parse results briefly. Commands that change device
+# state are never cached.
+TEST_CACHE_TTL = 5
+TEST_CACHE_SIZE = 512
+UNCACHEABLE_COMMANDS = frozenset({'turn_on', 'turn_off', 'set_brightness', 'set_temperature'})
+_test_cache = OrderedDict()
+_test_cache_lock = threading.Lock()
+
+# Hot read endpoints build their responses directly with orjson
+_JSON_MT = 'application/json'
+
+# Store recent events for the web interface; the deque drops the oldest
 max_events = 100
+recent_events = deque(maxlen=max_events)
+
+# Every event gets an increasing id so stream subscribers can tell which
+# events they have already sent; events_changed wakes them on each append
+_event_ids = itertools.count(1)
+events_changed = threading.Condition()
+
+# Idle streams send a comment this often so dead connections get noticed
+SSE_KEEPALIVE_SECONDS = 15
+
+# Shared by every event without data; events are never mutated after creation
+_EMPTY_DATA = {}
 
 def add_event(event_type: str, message: str, data: dict = None):
-    """Add an event to the recent events list"""
-    global recent_events
-    event = {
-        'type': event_type,
-        'message': message,
-        'timestamp': time.time(),
-        'data': data or {}
-    }
-    recent_events.append(event)
+    """
+    Add an event to the recent events list
     
-    # Keep only the most recent events
-    if len(recent_events) > max_events:
-        recent_events = recent_events[-max_events:]
+    Called from the recorder thread through the callbacks below, the
+    command worker and request handlers. The id is taken and the event
+    appended under events_changed, so ids reach the deque in order; stream
+    subscribers rely on that to skip events they have already sent.
+    Readers take a snapshot with list(recent_events), which copies in one
+    C-level call, instead of locking. Iterating the deque directly could
+    race with an append and raise RuntimeError.
+    """
+    with events_changed:
+        recent_events.append({
+            'id': next(_event_ids),
+            'type': event_type,
+            'message': message,
+            'timestamp': time.time_ns() // 1_000_000,  # ms since the epoch
+            'data': data or _EMPTY_DATA
+        })
+        events_changed.notify_all()
     
-    logger.info(f"Event added: {event_type} - {message}")
+    # Fires for every partial transcription, so keep it out of INFO
+    logger.debug("Event added: %s - %s", event_type, message)
+
+def _test_cache_get(key):
+    """Return the cached (command_type, params) for key, or None if absent or expired"""
+    with _test_cache_lock:
+        entry = _test_cache.get(key)
+        if entry is None:
+            return None
+        expires, parsed = entry
+        if expires < time.monotonic():
+            del _test_cache[key]
+            return None
+        _test_cache.move_to_end(key)
+        return parsed
+
+def _test_cache_put(key, parsed):
+    """Cache a parse result, evicting the least recently used entry when full"""
+    with _test_cache_lock:
+        _test_cache[key] = (time.monotonic() + TEST_CACHE_TTL, parsed)
+        _test_cache.move_to_end(key)
+        if len(_test_cache) > TEST_CACHE_SIZE:
+            _test_cache.popitem(last=False)
+
+def clear_test_cache():
+    """Forget all cached /test parse results"""
+    with _test_cache_lock:
+        _test_cache.clear()
+
+# Event messages for the built-in command types, so the callback doesn't
+# format one per command
+_CMD_MSGS = {
+    command_type: f"Command: {command_type}"
+    for command_type in ('turn_on', 'turn_off', 'set_brightness', 'set_temperature',
+                         'get_status', 'list_devices', 'unknown')
+}
+
+# Recognized commands are handed to a worker thread so slow device I/O
+# never holds up the recorder. When the queue is full, commands are dropped.
+COMMAND_QUEUE_SIZE = 64
+_cmd_queue = queue.Queue(maxsize=COMMAND_QUEUE_SIZE)
+_cmd_worker = None
+_cmd_worker_lock = threading.Lock()
+
+# The callbacks below run on the recorder thread. They must never take
+# assistant_lock, so that /start and /stop can't stall speech processing.
 
 def status_callback(status: str, message: str):
     """Callback for voice assistant status updates"""
@@ -50,15 +127,42 @@ def transcription_callback(text: str, is_final: bool):
     add_event(event_type, text, {'is_final': is_final})
 
 def command_callback(command_data: dict):
-    """Callback for processed commands"""
-    # Process the command with IoT device manager
-    result = device_manager.process_voice_command(command_data)
+    """Callback for processed commands; queues them for the worker thread"""
+    _ensure_command_worker()
+    try:
+        _cmd_queue.put_nowait(command_data)
+    except queue.Full:
+        logger.warning("Command queue full, dropping: %s", command_data['type'])
+        add_event('command_dropped', f"Command dropped: {command_data['type']}", command_data)
+
+def _ensure_command_worker():
+    """Start the command worker thread on first use"""
+    global _cmd_worker
     
-    # Add event with result
-    add_event('command', f"Command: {command_data['type']}", {
-        **command_data,
-        'result': result
-    })
+    if _cmd_worker is None:
+        with _cmd_worker_lock:
+            if _cmd_worker is None:
+                _cmd_worker = threading.Thread(target=_command_worker,
+                                               name='voice-commands', daemon=True)
+                _cmd_worker.start()
+
+def _command_worker():
+    """Run queued commands against the device manager, one at a time"""
+    while True:
+        command_data = _cmd_queue.get()
+        try:
+            # Process the command with IoT device manager
+            result = device_manager.process_voice_command(command_data)
+            
+            # Add event with result
+            command_type = command_data['type']
+            message = _CMD_MSGS.get(command_type) or f"Command: {command_type}"
+            add_event('command', message, {
+                **command_data,
+                'result': result
+            })
+        except Exception as e:
+            logger.error("Error processing command: %s", e)
 
 @voice_bp.route('/start', methods=['POST'])
 def start_assistant():
@@ -79,6 +183,7 @@ def start_assistant():
             model = data.get('model', 'base')
             
             # Create and configure voice assistant
+            clear_test_cache()
             voice_assistant = VoiceAssistant(wake_words=wake_words, model=model)
             
             # Register callbacks
@@ -101,7 +206,7 @@ def start_assistant():
             })
     
     except Exception as e:
-        logger.error(f"Error starting voice assistant: {e}")
+        logger.error("Error starting voice assistant: %s", e)
         return jsonify({
             'success': False,
             'message': f'Failed to start voice assistant: {str(e)}'
@@ -122,6 +227,7 @@ def stop_assistant():
             
             voice_assistant.stop()
             voice_assistant = None
+            clear_test_cache()
             
             add_event('system', 'Voice assistant stopped')
             
@@ -131,7 +237,7 @@ def stop_assistant():
             })
     
     except Exception as e:
-        logger.error(f"Error stopping voice assistant: {e}")
+        logger.error("Error stopping voice assistant: %s", e)
         return jsonify({
             'success': False,
             'message': f'Failed to stop voice assistant: {str(e)}'
@@ -140,33 +246,64 @@ def stop_assistant():
 @voice_bp.route('/status', methods=['GET'])
 def get_status():
     """Get voice assistant status"""
-    global voice_assistant
-    
     try:
-        with assistant_lock:
-            if voice_assistant:
-                status = voice_assistant.get_status()
-            else:
-                status = {
-                    'is_active': False,
-                    'is_listening': False,
-                    'wake_words': None,
-                    'model': None,
-                    'available_commands': []
-                }
-            
-            return jsonify({
-                'success': True,
-                'status': status
-            })
+        # No lock: assistant_lock only serializes /start and /stop. Reading
+        # the global once is atomic and gives a consistent reference even
+        # if /stop rebinds it meanwhile.
+        assistant = voice_assistant
+        if assistant:
+            status = assistant.get_status()
+        else:
+            status = {
+                'is_active': False,
+                'is_listening': False,
+                'wake_words': None,
+                'model': None,
+                'available_commands': []
+            }
+        
+        return Response(orjson.dumps({
+            'success': True,
+            'status': status
+        }, option=orjson.OPT_APPEND_NEWLINE), mimetype=_JSON_MT)
     
     except Exception as e:
-        logger.error(f"Error getting status: {e}")
+        logger.error("Error getting status: %s", e)
         return jsonify({
             'success': False,
             'message': f'Failed to get status: {str(e)}'
         }), 500
 
+def select_events(limit: int, event_type: str = None):
+    """
+    Pick the events a client asked for
+    
+    Args:
+        limit: Keep only the newest limit events (0 or less keeps all)
+        event_type: Only keep events of this type, if given
+        
+    Returns:
+        (selected events, total number of stored events)
+    """
+    # Snapshot first: the recorder thread may append while we filter
+    events = list(recent_events)
+    
+    if event_type:
+        # Scan newest first and stop once we have enough
+        filtered_events = []
+        for event in reversed(events):
+            if event['type'] == event_type:
+                filtered_events.append(event)
+                if len(filtered_events) == limit:
+                    break
+        filtered_events.reverse()
+    elif limit > 0:
+        filtered_events = events[-limit:]
+    else:
+        filtered_events = events
+    
+    return filtered_events, len(events)
+
 @voice_bp.route('/events', methods=['GET'])
 def get_events():
     """Get recent events"""
@@ -175,63 +312,117 @@ def get_events():
         limit = request.args.get('limit', 50, type=int)
         event_type = request.args.get('type')
         
-        # Filter events
-        filtered_events = recent_events
-        if event_type:
-            filtered_events = [e for e in recent_events if e['type'] == event_type]
-        
-        # Limit results
-        if limit > 0:
-            filtered_events = filtered_events[-limit:]
+        filtered_events, total_events = select_events(limit, event_type)
         
-        return jsonify({
+        # Hot polling path: serialize directly, skipping jsonify
+        return Response(orjson.dumps({
             'success': True,
             'events': filtered_events,
-            'total_events': len(recent_events)
-        })
+            'total_events': total_events
+        }, option=orjson.OPT_APPEND_NEWLINE), mimetype=_JSON_MT)
     
     except Exception as e:
-        logger.error(f"Error getting events: {e}")
+        logger.error("Error getting events: %s", e)
         return jsonify({
             'success': False,
             'message': f'Failed to get events: {str(e)}'
         }), 500
 
+@voice_bp.route('/events.ndjson', methods=['GET'])
+def get_events_ndjson():
+    """Stream recent events as newline-delimited JSON, one event per line"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        event_type = request.args.get('type')
+        
+        filtered_events, _ = select_events(limit, event_type)
+        
+        def generate():
+            for event in filtered_events:
+                yield orjson.dumps(event) + b'\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    except Exception as e:
+        logger.error("Error streaming events: %s", e)
+        return jsonify({
+            'success': False,
+            'message': f'Failed to stream events: {str(e)}'
+        }), 500
+
+def _newest_event_id() -> int:
+    """Id of the newest stored event, 0 if there are none"""
+    try:
+        return recent_events[-1]['id']
+    except IndexError:
+        return 0
+
+def _sse_events(last_id: int):
+    """Yield server-sent events for every event newer than last_id, forever"""
+    while True:
+        with events_changed:
+            # wait_for checks under the lock, so a notify can't slip in
+            # between the check and the wait
+            has_new = events_changed.wait_for(lambda: _newest_event_id() > last_id,
+                                              timeout=SSE_KEEPALIVE_SECONDS)
+        if not has_new:
+            yield b': keepalive\n\n'
+            continue
+        
+        for event in list(recent_events):
+            if event['id'] > last_id:
+                last_id = event['id']
+                yield b'id: %d\ndata: ' % last_id + orjson.dumps(event) + b'\n\n'
+
+@voice_bp.route('/events/stream', methods=['GET'])
+def stream_events():
+    """Push new events to the client as server-sent events"""
+    # Browsers send Last-Event-ID when reconnecting; new subscribers only
+    # get events from now on
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = _newest_event_id()
+    
+    response = Response(_sse_events(last_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @voice_bp.route('/events/clear', methods=['POST'])
 def clear_events():
     """Clear all events"""
-    global recent_events
-    
     try:
-        recent_events = []
+        recent_events.clear()
         return jsonify({
             'success': True,
             'message': 'Events cleared successfully'
         })
     
     except Exception as e:
-        logger.error(f"Error clearing events: {e}")
+        logger.error("Error clearing events: %s", e)
         return jsonify({
             'success': False,
             'message': f'Failed to clear events: {str(e)}'
         }), 500
 
+# The configuration options are static, so the /config body is built once
+_CONFIG_BYTES = orjson.dumps({
+    'success': True,
+    'config': {
+        'available_models': ['tiny', 'base', 'small', 'medium', 'large'],
+        'available_wake_words': [
+            'alexa', 'americano', 'blueberry', 'bumblebee', 'computer',
+            'grapefruits', 'grasshopper', 'hey google', 'hey siri', 'jarvis',
+            'ok google', 'picovoice', 'porcupine', 'terminator'
+        ],
+        'default_wake_words': 'jarvis',
+        'default_model': 'base'
+    }
+}, option=orjson.OPT_APPEND_NEWLINE)
+
 @voice_bp.route('/config', methods=['GET'])
 def get_config():
     """Get voice assistant configuration options"""
-    return jsonify({
-        'success': True,
-        'config': {
-            'available_models': ['tiny', 'base', 'small', 'medium', 'large'],
-            'available_wake_words': [
-                'alexa', 'americano', 'blueberry', 'bumblebee', 'computer',
-                'grapefruits', 'grasshopper', 'hey google', 'hey siri', 'jarvis',
-                'ok google', 'picovoice', 'porcupine', 'terminator'
-            ],
-            'default_wake_words': 'jarvis',
-            'default_model': 'base'
-        }
-    })
+    return Response(_CONFIG_BYTES, mimetype=_JSON_MT)
 
 @voice_bp.route('/test', methods=['POST'])
 def test_command():
@@ -247,12 +438,27 @@ def test_command():
         text = data['text']
         
         # Process the command if assistant is running
-        if voice_assistant and voice_assistant.is_active:
-            voice_assistant._process_command(text)
-            return jsonify({
+        assistant = voice_assistant
+        if assistant and assistant.is_active:
+            normalized = text.lower().strip()
+            cache_status = 'MISS'
+            if normalized:
+                key = (assistant.patterns_version, normalized)
+                parsed = _test_cache_get(key)
+                if parsed is not None:
+                    cache_status = 'HIT'
+                else:
+                    parsed = assistant.parse_command(normalized)
+                    if parsed[0] not in UNCACHEABLE_COMMANDS:
+                        _test_cache_put(key, parsed)
+                assistant._execute_command(*parsed, normalized)
+            
+            response = jsonify({
                 'success': True,
                 'message': f'Command processed: {text}'
             })
+            response.headers['X-Cache'] = cache_status
+            return response
         else:
             return jsonify({
                 'success': False,
@@ -260,7 +466,7 @@ def test_command():
             }), 400
     
     except Exception as e:
-        logger.error(f"Error testing command: {e}")
+        logger.error("Error testing command: %s", e)
         return jsonify({
             'success': False,
             'message': f'Failed to test command: {str(e)}'
@@ -3,6 +3,7 @@ Voice Assistant Module using RealtimeSTT
 Handles speech-to-text, natural language understanding, and command processing
 """
 
+import functools
 import threading
 import time
 import json
@@ -11,8 +12,6 @@ from typing import Dict, List, Callable, Optional
 from RealtimeSTT import AudioToTextRecorder
 import re
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class VoiceAssistant:
@@ -34,6 +33,8 @@ class VoiceAssistant:
         self.is_active = False
         self.recorder = None
         self.command_callbacks = {}
+        # command_type -> callbacks to run, specific first, then 'all'
+        self._callbacks_for = {}
         self.status_callback = None
         self.transcription_callback = None
         
@@ -75,6 +76,17 @@ class VoiceAssistant:
                 r'available devices'
             ]
         }
+        self._compiled_patterns = {
+            command_type: [re.compile(pattern) for pattern in patterns]
+            for command_type, patterns in self.command_patterns.items()
+        }
+        self._build_command_regex()
+        self._build_command_tokens()
+        self._available_commands_cache = tuple(self.command_patterns.keys())
+        # Bumped whenever the patterns change, for callers caching parse results
+        self.patterns_version = 0
+        # Per-instance memo of parse results; the same utterances recur a lot
+        self._parse_command = functools.lru_cache(maxsize=256)(self._parse_command_uncached)
         
         self._setup_recorder()
     
@@ -90,9 +102,9 @@ class VoiceAssistant:
                 on_realtime_transcription_update=self._on_realtime_transcription_update,
                 on_realtime_transcription_stabilized=self._on_realtime_transcription_stabilized
             )
-            logger.info(f"Voice assistant initialized with wake words: {self.wake_words}")
+            logger.info("Voice assistant initialized with wake words: %s", self.wake_words)
         except Exception as e:
-            logger.error(f"Failed to initialize recorder: {e}")
+            logger.error("Failed to initialize recorder: %s", e)
             raise
     
     def _on_recording_start(self):
@@ -122,13 +134,95 @@ class VoiceAssistant:
     
     def _on_realtime_transcription_stabilized(self, text):
         """Callback when transcription is stabilized (final)"""
-        logger.info(f"Final transcription: {text}")
+        logger.info("Final transcription: %s", text)
         if self.transcription_callback:
             self.transcription_callback(text, True)  # True = final
         
         # Process the command
         self._process_command(text)
     
+    def _build_command_regex(self):
+        """
+        Fuse every command pattern into a single alternation so a command
+        is found in one scan of the text
+        
+        Each pattern becomes a named group _<n>; _command_branches maps that
+        name to (command_type, first, last) bounds of the pattern's own
+        groups within match.groups(). Patterns that cannot be embedded
+        (numbered backreferences, clashing group names, misplaced global
+        flags) disable fusion and _process_command falls back to trying
+        _compiled_patterns one by one.
+        """
+        branches = []
+        self._command_branches = {}
+        group_count = 0
+        for command_type, patterns in self._compiled_patterns.items():
+            for compiled in patterns:
+                if re.search(r'\\\d', compiled.pattern):
+                    self._command_regex = None
+                    return
+                name = f'_{len(branches)}'
+                branches.append(f'(?P<{name}>{compiled.pattern})')
+                # The wrapper is group group_count + 1; the pattern's own
+                # groups follow it
+                first = group_count + 1
+                self._command_branches[name] = (command_type, first, first + compiled.groups)
+                group_count = first + compiled.groups
+        
+        try:
+            self._command_regex = re.compile('|'.join(branches)) if branches else None
+        except re.error:
+            self._command_regex = None
+    
+    def _build_command_tokens(self):
+        """
+        Collect the literal word each command pattern starts with
+        
+        Every pattern needs its leading word somewhere in the text to match,
+        so text containing none of them cannot be a command. If some pattern
+        has no literal leading word (or uses a top-level alternation),
+        _command_tokens is None and no prefiltering happens.
+        """
+        tokens = set()
+        for patterns in self.command_patterns.values():
+            for pattern in patterns:
+                match = re.match(r'[a-z]+', pattern)
+                if not match or self._has_top_level_alternation(pattern):
+                    self._command_tokens = None
+                    return
+                word = match.group()
+                # A quantifier right after the word only applies to its last letter
+                if pattern[match.end():match.end() + 1] in ('?', '*', '{'):
+                    word = word[:-1]
+                if not word:
+                    self._command_tokens = None
+                    return
+                tokens.add(word)
+        self._command_tokens = frozenset(tokens)
+    
+    @staticmethod
+    def _has_top_level_alternation(pattern: str) -> bool:
+        """Check for a | outside any group or character class"""
+        depth = 0
+        in_class = False
+        escaped = False
+        for char in pattern:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif in_class:
+                in_class = char != ']'
+            elif char == '[':
+                in_class = True
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            elif char == '|' and depth == 0:
+                return True
+        return False
+    
     def _process_command(self, text: str):
         """
         Process the transcribed text and extract commands
@@ -140,18 +234,56 @@ class VoiceAssistant:
             return
         
         text = text.lower().strip()
-        logger.info(f"Processing command: {text}")
+        logger.info("Processing command: %s", text)
         
-        # Try to match command patterns
-        for command_type, patterns in self.command_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, text)
-                if match:
-                    self._execute_command(command_type, match.groups(), text)
-                    return
+        command_type, params = self._parse_command(text)
+        self._execute_command(command_type, params, text)
+    
+    def parse_command(self, text: str) -> tuple:
+        """
+        Recognize a command without executing it
+        
+        Args:
+            text: The transcribed text to parse
+            
+        Returns:
+            (command_type, params) tuple; ('unknown', (text,)) if nothing matches
+        """
+        return self._parse_command(text.lower().strip())
+    
+    def _parse_command_uncached(self, text: str) -> tuple:
+        """
+        Match normalized text against the command patterns
+        
+        Args:
+            text: Lowercased, stripped text
+            
+        Returns:
+            (command_type, params) tuple; ('unknown', (text,)) if nothing matches
+        """
+        # Cheap substring prefilter before any regex work
+        if self._command_tokens is not None and \
+                not any(token in text for token in self._command_tokens):
+            return 'unknown', (text,)
+        
+        # Try to match command patterns. The fused regex picks the match
+        # starting earliest in the text, ties going to the first declared
+        # pattern.
+        if self._command_regex is not None:
+            match = self._command_regex.search(text)
+            if match:
+                # The outermost (wrapper) group closes last
+                command_type, first, last = self._command_branches[match.lastgroup]
+                return command_type, match.groups()[first:last]
+        else:
+            for command_type, patterns in self._compiled_patterns.items():
+                for pattern in patterns:
+                    match = pattern.search(text)
+                    if match:
+                        return command_type, match.groups()
         
         # If no pattern matched, treat as unknown command
-        self._execute_command('unknown', (text,), text)
+        return 'unknown', (text,)
     
     def _execute_command(self, command_type: str, params: tuple, original_text: str):
         """
@@ -166,24 +298,20 @@ class VoiceAssistant:
             'type': command_type,
             'params': params,
             'original_text': original_text,
-            'timestamp': time.time()
+            'timestamp': time.time_ns() // 1_000_000  # ms since the epoch
         }
         
-        logger.info(f"Executing command: {command_data}")
+        logger.info("Executing command: %s", command_data)
         
-        # Call registered callback for this command type
-        if command_type in self.command_callbacks:
+        # Types without a specific callback only get the general one
+        callbacks = self._callbacks_for.get(command_type)
+        if callbacks is None:
+            callbacks = self._callbacks_for.get('all', ())
+        for callback in callbacks:
             try:
-                self.command_callbacks[command_type](command_data)
+                callback(command_data)
             except Exception as e:
-                logger.error(f"Error executing command callback: {e}")
-        
-        # Call general command callback if registered
-        if 'all' in self.command_callbacks:
-            try:
-                self.command_callbacks['all'](command_data)
-            except Exception as e:
-                logger.error(f"Error executing general command callback: {e}")
+                logger.error("Error executing command callback: %s", e)
     
     def register_command_callback(self, command_type: str, callback: Callable):
         """
@@ -194,7 +322,14 @@ class VoiceAssistant:
             callback: Function to call when command is recognized
         """
         self.command_callbacks[command_type] = callback
-        logger.info(f"Registered callback for command type: {command_type}")
+        
+        general = self.command_callbacks.get('all')
+        self._callbacks_for = {
+            registered_type: (registered,) if registered_type == 'all' or general is None
+            else (registered, general)
+            for registered_type, registered in self.command_callbacks.items()
+        }
+        logger.info("Registered callback for command type: %s", command_type)
     
     def register_status_callback(self, callback: Callable):
         """
@@ -233,7 +368,7 @@ class VoiceAssistant:
                         if self.recorder:
                             self.recorder.text()  # This will block until speech is detected
                     except Exception as e:
-                        logger.error(f"Error in listen loop: {e}")
+                        logger.error("Error in listen loop: %s", e)
                         time.sleep(1)  # Brief pause before retrying
             
             self.listen_thread = threading.Thread(target=listen_loop, daemon=True)
@@ -245,7 +380,7 @@ class VoiceAssistant:
             logger.info("Voice assistant started successfully")
             
         except Exception as e:
-            logger.error(f"Failed to start voice assistant: {e}")
+            logger.error("Failed to start voice assistant: %s", e)
             self.is_active = False
             raise
     
@@ -268,7 +403,7 @@ class VoiceAssistant:
             logger.info("Voice assistant stopped successfully")
             
         except Exception as e:
-            logger.error(f"Error stopping voice assistant: {e}")
+            logger.error("Error stopping voice assistant: %s", e)
     
     def get_status(self) -> Dict:
         """
@@ -282,7 +417,7 @@ class VoiceAssistant:
             'is_listening': self.is_listening,
             'wake_words': self.wake_words,
             'model': self.model,
-            'available_commands': list(self.command_patterns.keys())
+            'available_commands': self._available_commands_cache
         }
     
     def add_command_pattern(self, command_type: str, pattern: str):
@@ -293,11 +428,19 @@ class VoiceAssistant:
             command_type: Type of command
             pattern: Regular expression pattern
         """
+        compiled = re.compile(pattern)
         if command_type not in self.command_patterns:
             self.command_patterns[command_type] = []
+            self._compiled_patterns[command_type] = []
         
         self.command_patterns[command_type].append(pattern)
-        logger.info(f"Added pattern for {command_type}: {pattern}")
+        self._compiled_patterns[command_type].append(compiled)
+        self._build_command_regex()
+        self._build_command_tokens()
+        self._parse_command.cache_clear()
+        self.patterns_version += 1
+        self._available_commands_cache = tuple(self.command_patterns.keys())
+        logger.info("Added pattern for %s: %s", command_type, pattern)
     
     def remove_command_pattern(self, command_type: str, pattern: str):
         """
@@ -309,6 +452,14 @@ class VoiceAssistant:
         """
         if command_type in self.command_patterns:
             if pattern in self.command_patterns[command_type]:
-                self.command_patterns[command_type].remove(pattern)
-                logger.info(f"Removed pattern for {command_type}: {pattern}")
+                # The compiled list parallels the source list
+                index = self.command_patterns[command_type].index(pattern)
+                del self.command_patterns[command_type][index]
+                del self._compiled_patterns[command_type][index]
+                self._build_command_regex()
+                self._build_command_tokens()
+                self._parse_command.cache_clear()
+                self.patterns_version += 1
+                self._available_commands_cache = tuple(self.command_patterns.keys())
+                logger.info("Removed pattern for %s: %s", command_type, pattern)
 